@@ -3,60 +3,115 @@
 Claude Code hook to handle rate limit by sleeping until reset time.
 Can also be invoked manually via CLI: python rate-limit-sleep.py 2h
 """
+import atexit
+import os
 import sys
 import json
 import re
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 from pathlib import Path
 
+try:
+    # Optional: RE2 matches in linear time, with no backtracking on long transcripts
+    import re2 as _re
+except ImportError:
+    _re = re
+
 LOG_FILE = Path.home() / ".claude" / "hooks" / "rate-limit.log"
 BUFFER_MINUTES = 5
+TRANSCRIPT_TAIL_BYTES = 64 * 1024
+TRANSCRIPT_SEARCH_CHARS = 4096
+SLEEP_CHECK_SECONDS = 60
+
+# Hook responses, serialized once
+_RESP_CONTINUE = json.dumps({"continue": True})
+_RESP_STOP = json.dumps({"continue": False})
+
+# Local timezone, resolved once at import
+_LOCAL_TZ = datetime.now().astimezone().tzinfo
+
+# Rate limit indicators, combined into one alternation so the message is scanned once
+# (flags are inline because re2 does not accept re.IGNORECASE)
+_RATE_LIMIT_RE = _re.compile(
+    r"(?i)hit your limit"
+    r"|usage limit"
+    r"|stop\s+and\s+wait\s+for\s+(?:limit|rate)"
+    r"|rate\s*limit"
+)
+
+# Reset time and timezone, e.g. "4am (America/Los_Angeles)"
+_TIME_TZ_RE = _re.compile(r"(?i)(\d{1,2}(?::\d{2})?\s*(?:am|pm))\s*\(([^)]+)\)")
+
+# Durations like "2h", "30m", "45s"
+_DURATION_RE = re.compile(
+    r"^(\d+(?:\.\d+)?)\s*(h|hr|hrs|hour|hours|m|min|mins|minute|minutes|s|sec|secs|second|seconds)$",
+    re.IGNORECASE,
+)
+
+# Seconds per duration unit
+_DURATION_UNITS = {u: 3600 for u in ("h", "hr", "hrs", "hour", "hours")}
+_DURATION_UNITS.update({u: 60 for u in ("m", "min", "mins", "minute", "minutes")})
+_DURATION_UNITS.update({u: 1 for u in ("s", "sec", "secs", "second", "seconds")})
+
+# Times like "4am", "4:00am", "11:30pm" (minutes optional)
+_AMPM_RE = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)", re.IGNORECASE)
+
+_log_file = None
 
 def log(message: str):
     """Append timestamped message to log file."""
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOG_FILE, "a") as f:
-        f.write(f"[{timestamp}] {message}\n")
+    global _log_file
+    if _log_file is None:
+        # Open once and keep the handle; line buffering keeps `tail -f` current during long sleeps
+        LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+        _log_file = open(LOG_FILE, "a", encoding="utf-8", buffering=1)
+        atexit.register(_log_file.close)
+    _log_file.write(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}\n")
+
+@lru_cache(maxsize=64)
+def _get_zoneinfo(tz_str: str) -> ZoneInfo:
+    """Return a cached ZoneInfo for an IANA timezone name."""
+    return ZoneInfo(tz_str)
+
+def is_rate_limit_message(message: str) -> bool:
+    """Check whether a message looks like a rate limit notice."""
+    # Every indicator contains "limit" or "rate"; skip the regex when neither is present
+    lowered = message.lower()
+    if "limit" not in lowered and "rate" not in lowered:
+        return False
+    return bool(_RATE_LIMIT_RE.search(message))
+
+def extract_reset_time(message: str) -> tuple[str, str] | None:
+    """Extract reset time and timezone like ('4am', 'America/Los_Angeles'). Returns None if not found."""
+    match = _TIME_TZ_RE.search(message)
+    if not match:
+        return None
+    return match.group(1), match.group(2)
 
 def parse_duration(duration_str: str) -> int | None:
     """Parse duration like '2h', '30m', '45s' into seconds. Returns None if not a duration."""
     duration_str = duration_str.lower().strip()
-    match = re.match(r"^(\d+(?:\.\d+)?)\s*(h|hr|hrs|hour|hours|m|min|mins|minute|minutes|s|sec|secs|second|seconds)$", duration_str)
+    match = _DURATION_RE.match(duration_str)
     if not match:
         return None
     
     value = float(match.group(1))
     unit = match.group(2)
     
-    if unit in ("h", "hr", "hrs", "hour", "hours"):
-        return int(value * 3600)
-    elif unit in ("m", "min", "mins", "minute", "minutes"):
-        return int(value * 60)
-    else:  # seconds
-        return int(value)
+    return int(value * _DURATION_UNITS[unit])
 
-def parse_time_to_seconds(time_str: str, tz: ZoneInfo = None) -> int | None:
-    """Parse time like '4pm', '11:30am' into seconds until that time. Returns None if not a time."""
-    time_str = time_str.lower().strip()
+def _parse_hour_minute(time_str: str) -> tuple[int, int] | None:
+    """Parse time like '4am', '4:00am', '11:30pm' into a 24-hour (hour, minute). Returns None if not a time."""
+    match = _AMPM_RE.fullmatch(time_str.lower().strip())
+    if not match:
+        return None
     
-    # Try to match time formats
-    if ":" in time_str:
-        match = re.match(r"^(\d{1,2}):(\d{2})\s*(am|pm)$", time_str)
-        if not match:
-            return None
-        hour = int(match.group(1))
-        minute = int(match.group(2))
-        period = match.group(3)
-    else:
-        match = re.match(r"^(\d{1,2})\s*(am|pm)$", time_str)
-        if not match:
-            return None
-        hour = int(match.group(1))
-        minute = 0
-        period = match.group(2)
+    hour = int(match.group(1))
+    minute = int(match.group(2) or 0)
+    period = match.group(3)
     
     # Convert to 24-hour
     if period == "pm" and hour != 12:
@@ -64,9 +119,18 @@ def parse_time_to_seconds(time_str: str, tz: ZoneInfo = None) -> int | None:
     elif period == "am" and hour == 12:
         hour = 0
     
+    return hour, minute
+
+def parse_time_to_seconds(time_str: str, tz: ZoneInfo = None) -> int | None:
+    """Parse time like '4pm', '11:30am' into seconds until that time. Returns None if not a time."""
+    parsed = _parse_hour_minute(time_str)
+    if parsed is None:
+        return None
+    hour, minute = parsed
+    
     # Use local timezone if not specified
     if tz is None:
-        tz = datetime.now().astimezone().tzinfo
+        tz = _LOCAL_TZ
     
     now = datetime.now(tz)
     target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
@@ -91,44 +155,27 @@ def parse_duration_or_time(arg: str) -> int:
     
     raise ValueError(f"Could not parse '{arg}' as duration (e.g., 2h, 30m) or time (e.g., 4pm, 11:30am)")
 
-def parse_reset_time(time_str: str, tz_str: str) -> datetime:
-    """Parse reset time like '4am' or '11:30pm' with timezone."""
+def parse_reset_time(time_str: str, tz_str: str, now: datetime | None = None) -> datetime:
+    """Parse reset time like '4am' or '11:30pm' with timezone, relative to now (default: current time)."""
     # Normalize timezone string (handle common variations)
     tz_str = tz_str.strip().replace(" ", "_")
     
     # Try to get timezone, with fallback to local timezone
     try:
-        tz = ZoneInfo(tz_str)
+        tz = _get_zoneinfo(tz_str)
     except Exception as e:
         # On Windows without tzdata package, ZoneInfo may not find IANA timezones
         # Fall back to local system timezone
         log(f"DEBUG: ZoneInfo failed for '{tz_str}': {e}, using local timezone")
-        tz = datetime.now().astimezone().tzinfo
-
-    # Parse time - handle formats: "4am", "4:00am", "11:30pm"
-    time_str = time_str.lower().strip()
-
-    if ":" in time_str:
-        # Format: "4:00am" or "11:30pm"
-        match = re.match(r"(\d{1,2}):(\d{2})\s*(am|pm)", time_str)
-        hour = int(match.group(1))
-        minute = int(match.group(2))
-        period = match.group(3)
-    else:
-        # Format: "4am" or "11pm"
-        match = re.match(r"(\d{1,2})\s*(am|pm)", time_str)
-        hour = int(match.group(1))
-        minute = 0
-        period = match.group(2)
+        tz = _LOCAL_TZ
 
-    # Convert to 24-hour
-    if period == "pm" and hour != 12:
-        hour += 12
-    elif period == "am" and hour == 12:
-        hour = 0
+    parsed = _parse_hour_minute(time_str)
+    if parsed is None:
+        raise ValueError(f"Could not parse reset time '{time_str}'")
+    hour, minute = parsed
 
     # Get current time in that timezone
-    now = datetime.now(tz)
+    now = now.astimezone(tz) if now is not None else datetime.now(tz)
     reset = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
 
     # If reset time is in the past, it's for tomorrow
@@ -137,17 +184,35 @@ def parse_reset_time(time_str: str, tz_str: str) -> datetime:
 
     return reset
 
+def _sleep_until(wake_time: datetime, now: datetime | None = None):
+    """Sleep until wake_time (timezone-aware), measured from now (default: current time)."""
+    # Sleep in short steps and resync, so a suspend or clock change can't
+    # cause a long oversleep; the monotonic deadline covers the clock going backwards.
+    # Subtracting from a UTC now gives elapsed time; two datetimes sharing a ZoneInfo
+    # would subtract as wall-clock time and be off by an hour across DST changes
+    remaining = (wake_time - (now or datetime.now(timezone.utc))).total_seconds()
+    deadline = time.monotonic() + remaining
+    while remaining > 0:
+        time.sleep(min(remaining, SLEEP_CHECK_SECONDS))
+        remaining = min(
+            (wake_time - datetime.now(timezone.utc)).total_seconds(),
+            deadline - time.monotonic(),
+        )
+
 def manual_sleep(arg: str):
     """Handle manual invocation via CLI argument."""
     try:
         sleep_seconds = parse_duration_or_time(arg)
-        wake_time = datetime.now() + timedelta(seconds=sleep_seconds)
+        # Keep the wake time in UTC so a DST change can't shorten the sleep
+        now = datetime.now(timezone.utc)
+        wake_time = now + timedelta(seconds=sleep_seconds)
+        local_wake_time = wake_time.astimezone()
         
         log(f"Manual sleep requested: {arg} ({sleep_seconds} seconds)")
-        log(f"Sleeping until {wake_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        log(f"Sleeping until {local_wake_time.strftime('%Y-%m-%d %H:%M:%S')}")
         
-        print(f"Sleeping for {sleep_seconds} seconds (until {wake_time.strftime('%H:%M:%S')})...")
-        time.sleep(sleep_seconds)
+        print(f"Sleeping for {sleep_seconds} seconds (until {local_wake_time.strftime('%H:%M:%S')})...")
+        _sleep_until(wake_time, now)
         
         log("Waking up - resuming Claude")
         print("Awake! Resuming...")
@@ -161,43 +226,39 @@ def manual_sleep(arg: str):
         sys.exit(0)
 
 def get_recent_transcript_content(transcript_path: str, num_lines: int = 20) -> str:
-    """Read the last N lines of the transcript JSONL file and extract text content."""
+    """Read the last N lines of the transcript JSONL file as text.
+
+    Returns an empty string if none of those lines could contain a rate limit notice.
+    """
     try:
-        path = Path(transcript_path)
-        if not path.exists():
+        # Read only the tail of the file; transcripts can grow to many MB
+        try:
+            with open(transcript_path, "rb") as f:
+                end = f.seek(0, os.SEEK_END)
+                start = max(0, end - TRANSCRIPT_TAIL_BYTES)
+                f.seek(start)
+                tail = f.read()
+        except FileNotFoundError:
             log(f"DEBUG: Transcript file not found: {transcript_path}")
             return ""
+
+        lines = tail.decode("utf-8", errors="replace").split("\n")
+        if start > 0:
+            # First line is likely cut off mid-entry
+            lines = lines[1:]
+        lines = [line for line in lines if line.strip()]
+
+        recent_lines = lines[-num_lines:]
         
-        # Read all lines and get last N
-        with open(path, "r", encoding="utf-8", errors="replace") as f:
-            lines = f.readlines()
-        
-        recent_lines = lines[-num_lines:] if len(lines) > num_lines else lines
+        # The raw JSONL lines already hold every field as text, so they're searched as-is
+        recent_text = " ".join(recent_lines)
         
-        # Extract text content from each JSON line
-        content_parts = []
-        for line in recent_lines:
-            try:
-                entry = json.loads(line.strip())
-                # Look for message content in various possible locations
-                if isinstance(entry, dict):
-                    # Common patterns for message content
-                    if "message" in entry:
-                        msg = entry["message"]
-                        if isinstance(msg, str):
-                            content_parts.append(msg)
-                        elif isinstance(msg, dict) and "content" in msg:
-                            content_parts.append(str(msg["content"]))
-                    if "content" in entry:
-                        content_parts.append(str(entry["content"]))
-                    if "text" in entry:
-                        content_parts.append(str(entry["text"]))
-                    # Also stringify the whole entry to catch nested content
-                    content_parts.append(str(entry))
-            except json.JSONDecodeError:
-                content_parts.append(line)
+        # Every rate limit indicator contains "limit" or "rate"; skip the content when neither appears
+        lowered = recent_text.lower()
+        if "limit" not in lowered and "rate" not in lowered:
+            return ""
         
-        return " ".join(content_parts)
+        return recent_text
     except Exception as e:
         log(f"DEBUG: Error reading transcript: {e}")
         return ""
@@ -205,10 +266,11 @@ def get_recent_transcript_content(transcript_path: str, num_lines: int = 20) ->
 
 def hook_mode():
     """Handle hook mode - read from stdin."""
+    # Read stdin once; the raw text is scanned directly so it never needs re-serializing
+    raw = sys.stdin.read()
+    log(f"DEBUG: Received JSON input: {raw.strip()[:1000]}")
     try:
-        # Read stdin
-        input_data = json.load(sys.stdin)
-        log(f"DEBUG: Received JSON input: {json.dumps(input_data, indent=2)[:1000]}")
+        input_data = json.loads(raw)
     except json.JSONDecodeError as e:
         log(f"DEBUG: JSON decode error: {e}")
         input_data = {}
@@ -216,66 +278,59 @@ def hook_mode():
     # Stop hooks don't receive message content directly - only metadata
     # We need to read the transcript file to find rate limit messages
     transcript_path = input_data.get("transcript_path", "")
-    transcript_content = get_recent_transcript_content(transcript_path)
+    transcript_content = get_recent_transcript_content(transcript_path) if transcript_path else ""
     
-    # Combine input metadata and transcript content for searching
-    message = str(input_data) + " " + transcript_content
+    # Combine input metadata and transcript content for searching. The stop reason is
+    # at the end of the transcript, so only its last TRANSCRIPT_SEARCH_CHARS are scanned;
+    # a notice followed by more transcript text than that is not detected
+    message = raw + " " + transcript_content[-TRANSCRIPT_SEARCH_CHARS:]
     log(f"DEBUG: Combined message (first 500 chars): {message[:500]}")
 
-    # Rate limit indicator patterns
-    rate_limit_indicators = [
-        r"hit your limit",
-        r"usage limit",
-        r"stop\s+and\s+wait\s+for\s+(?:limit|rate)",
-        r"rate\s*limit",
-    ]
-
     # Check if this looks like a rate limit scenario
-    is_rate_limit = any(re.search(p, message, re.IGNORECASE) for p in rate_limit_indicators)
+    is_rate_limit = is_rate_limit_message(message)
     log(f"DEBUG: is_rate_limit = {is_rate_limit}")
 
     if not is_rate_limit:
         log("DEBUG: Not a rate limit, returning continue=False")
-        print(json.dumps({"continue": False}))
+        print(_RESP_STOP)
         return
 
     # Extract time and timezone from the message
-    time_pattern = r"(\d{1,2}(?::\d{2})?\s*(?:am|pm))\s*\(([^)]+)\)"
-    match = re.search(time_pattern, message, re.IGNORECASE)
+    reset = extract_reset_time(message)
 
-    if not match:
+    if reset is None:
         log("Rate limit detected but no reset time found")
-        print(json.dumps({"continue": False}))
+        print(_RESP_STOP)
         return
 
-    time_str = match.group(1)  # e.g., "4am" or "11:30pm"
-    tz_str = match.group(2)    # e.g., "America/Los_Angeles"
+    time_str, tz_str = reset  # e.g., "4am", "America/Los_Angeles"
 
     log(f"Rate limit detected. Reset time: {time_str} ({tz_str})")
 
     try:
-        reset_time = parse_reset_time(time_str, tz_str)
+        now = datetime.now(timezone.utc)
+        reset_time = parse_reset_time(time_str, tz_str, now)
         wake_time = reset_time + timedelta(minutes=BUFFER_MINUTES)
 
         # Calculate sleep duration
-        now = datetime.now(reset_time.tzinfo)
         sleep_seconds = (wake_time - now).total_seconds()
 
         if sleep_seconds > 0:
             log(f"Sleeping until {wake_time.strftime('%Y-%m-%d %H:%M:%S %Z')} ({sleep_seconds:.0f} seconds)")
             print(f"Rate limit sleep: Pausing for {sleep_seconds:.0f} seconds until {wake_time.strftime('%H:%M:%S')}...", file=sys.stderr)
-            time.sleep(sleep_seconds)
+            # Seed from the same now, so the duration slept matches the one logged
+            _sleep_until(wake_time, now)
             log("Waking up - resuming Claude")
         else:
             log("Reset time already passed, continuing immediately")
 
         # Tell Claude to continue (block the stop, resume Claude)
-        print(json.dumps({"continue": True}))
+        print(_RESP_CONTINUE)
 
     except Exception as e:
         log(f"Error parsing time: {e}")
         # On error, allow normal stop behavior
-        print(json.dumps({"continue": False}))
+        print(_RESP_STOP)
 
 def main():
     # Check if invoked with CLI argument (manual mode)
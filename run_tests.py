@@ -3,16 +3,29 @@
 # requires-python = ">=3.9"
 # dependencies = [
 #     "pytest",
+#     "pyfakefs",
+#     "pytest-xdist",
+#     "orjson",
 #     "tzdata",
 # ]
 # ///
 """Test runner using uv inline script metadata."""
+import os
 import subprocess
 import sys
 from pathlib import Path
 
 script_dir = Path(__file__).parent
-sys.exit(subprocess.call(
-    [sys.executable, "-m", "pytest", "tests/", "-q"] + sys.argv[1:],
-    cwd=script_dir
-))
+# Skip the cache plugin's .pytest_cache writes and sys.path-based test imports
+args = [
+    sys.executable, "-m", "pytest", "tests/", "-q",
+    "-p", "no:cacheprovider", "--import-mode=importlib",
+] + sys.argv[1:]
+
+if os.name == "nt":
+    # exec on Windows spawns a new process and exits immediately, losing the exit code
+    sys.exit(subprocess.call(args, cwd=script_dir))
+
+# Replace this process with pytest rather than waiting on a child
+os.chdir(script_dir)
+os.execv(sys.executable, args)
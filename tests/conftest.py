@@ -1,5 +1,7 @@
 """Pytest configuration and fixtures."""
 import sys
+from datetime import datetime, timedelta
+from functools import cache
 from pathlib import Path
 import importlib.util
 import pytest
@@ -9,8 +11,43 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 
+def pytest_configure(config):
+    config.addinivalue_line("markers", "real_fs: test touches the real filesystem instead of pyfakefs")
+
+
+class FakeClock:
+    """Wall and monotonic clocks that only advance when time.sleep is called."""
+
+    def __init__(self, start_utc: datetime, local_tz):
+        self.utc = start_utc
+        self.local_tz = local_tz
+        self.monotonic = 0.0
+        self.slept = 0.0
+
+    def install(self, module, monkeypatch):
+        """Patch the module's datetime.now, time.monotonic and time.sleep with this clock."""
+        clock = self
+
+        class FakeDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                if tz is None:
+                    return clock.utc.astimezone(clock.local_tz).replace(tzinfo=None)
+                return clock.utc.astimezone(tz)
+
+        monkeypatch.setattr(module, "datetime", FakeDatetime)
+        monkeypatch.setattr(module.time, "monotonic", lambda: clock.monotonic)
+        monkeypatch.setattr(module.time, "sleep", clock.sleep)
+
+    def sleep(self, seconds: float):
+        self.utc += timedelta(seconds=seconds)
+        self.monotonic += seconds
+        self.slept += seconds
+
+
+@cache
 def _load_rate_limit_module():
-    """Load the rate-limit-sleep module (handles hyphenated filename)."""
+    """Load the rate-limit-sleep module once (handles hyphenated filename)."""
     module_path = project_root / "rate-limit-sleep.py"
     spec = importlib.util.spec_from_file_location("rate_limit_sleep", module_path)
     module = importlib.util.module_from_spec(spec)
@@ -18,7 +55,17 @@ def _load_rate_limit_module():
     return module
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def rate_limit_sleep():
     """Fixture providing access to the rate-limit-sleep module."""
     return _load_rate_limit_module()
+
+
+@pytest.fixture
+def fake_clock(rate_limit_sleep, monkeypatch):
+    """Fixture returning a factory that installs a FakeClock on the rate-limit-sleep module."""
+    def install(start_utc: datetime, local_tz) -> FakeClock:
+        clock = FakeClock(start_utc, local_tz)
+        clock.install(rate_limit_sleep, monkeypatch)
+        return clock
+    return install
@@ -1,128 +1,121 @@
 """Tests for rate limit detection patterns."""
 import pytest
+import io
 import json
-import re
+import sys
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
 
 
-def check_rate_limit_detection(message: str) -> bool:
+def check_rate_limit_detection(rate_limit_sleep, message: str) -> bool:
     """Helper to check if a message would be detected as rate limit."""
-    rate_limit_indicators = [
-        r"hit your limit",
-        r"usage limit",
-        r"stop\s+and\s+wait\s+for\s+(?:limit|rate)",
-        r"rate\s*limit",
-    ]
-    return any(re.search(p, message, re.IGNORECASE) for p in rate_limit_indicators)
+    return rate_limit_sleep.is_rate_limit_message(message)
 
 
-def extract_time_and_tz(message: str) -> tuple:
+def extract_time_and_tz(rate_limit_sleep, message: str) -> tuple:
     """Helper to extract time and timezone from a message."""
-    time_pattern = r"(\d{1,2}(?::\d{2})?\s*(?:am|pm))\s*\(([^)]+)\)"
-    match = re.search(time_pattern, message, re.IGNORECASE)
-    if match:
-        return match.group(1), match.group(2)
-    return None, None
+    return rate_limit_sleep.extract_reset_time(message) or (None, None)
 
 
 class TestRateLimitPatterns:
     """Test rate limit message detection."""
 
-    def test_hit_your_limit(self):
+    def test_hit_your_limit(self, rate_limit_sleep):
         """Test 'hit your limit' pattern."""
         msg = "hit your limit resets 4am (America/Los_Angeles)"
-        assert check_rate_limit_detection(msg)
+        assert check_rate_limit_detection(rate_limit_sleep, msg)
 
-    def test_usage_limit(self):
+    def test_usage_limit(self, rate_limit_sleep):
         """Test 'usage limit' pattern."""
         msg = "usage limit reached, resets 4am (America/Los_Angeles)"
-        assert check_rate_limit_detection(msg)
+        assert check_rate_limit_detection(rate_limit_sleep, msg)
 
-    def test_stop_and_wait_for_limit(self):
+    def test_stop_and_wait_for_limit(self, rate_limit_sleep):
         """Test 'stop and wait for limit' menu option pattern."""
         msg = "Stop and wait for limit to reset 4am (America/Los_Angeles)"
-        assert check_rate_limit_detection(msg)
+        assert check_rate_limit_detection(rate_limit_sleep, msg)
 
-    def test_stop_and_wait_for_rate(self):
+    def test_stop_and_wait_for_rate(self, rate_limit_sleep):
         """Test 'stop and wait for rate' pattern."""
         msg = "Stop and wait for rate to reset 4am (UTC)"
-        assert check_rate_limit_detection(msg)
+        assert check_rate_limit_detection(rate_limit_sleep, msg)
 
-    def test_rate_limit_pattern(self):
+    def test_rate_limit_pattern(self, rate_limit_sleep):
         """Test 'rate limit' pattern."""
         msg = "rate limit exceeded, try again at 4am (UTC)"
-        assert check_rate_limit_detection(msg)
+        assert check_rate_limit_detection(rate_limit_sleep, msg)
 
-    def test_ratelimit_no_space(self):
+    def test_ratelimit_no_space(self, rate_limit_sleep):
         """Test 'ratelimit' without space."""
         msg = "ratelimit exceeded at 4am (UTC)"
-        assert check_rate_limit_detection(msg)
+        assert check_rate_limit_detection(rate_limit_sleep, msg)
 
-    def test_case_insensitive(self):
+    def test_case_insensitive(self, rate_limit_sleep):
         """Test that detection is case insensitive."""
         msg = "HIT YOUR LIMIT resets 4am (UTC)"
-        assert check_rate_limit_detection(msg)
+        assert check_rate_limit_detection(rate_limit_sleep, msg)
 
 
 class TestNonRateLimitPatterns:
     """Test that non-rate-limit messages are not detected."""
 
-    def test_user_requested_stop(self):
+    def test_user_requested_stop(self, rate_limit_sleep):
         """Test user requested stop is not detected."""
         msg = "user requested"
-        assert not check_rate_limit_detection(msg)
+        assert not check_rate_limit_detection(rate_limit_sleep, msg)
 
-    def test_normal_completion(self):
+    def test_normal_completion(self, rate_limit_sleep):
         """Test normal completion is not detected."""
         msg = "task completed successfully"
-        assert not check_rate_limit_detection(msg)
+        assert not check_rate_limit_detection(rate_limit_sleep, msg)
 
-    def test_error_stop(self):
+    def test_error_stop(self, rate_limit_sleep):
         """Test error stop is not detected."""
         msg = "error occurred during execution"
-        assert not check_rate_limit_detection(msg)
+        assert not check_rate_limit_detection(rate_limit_sleep, msg)
 
-    def test_empty_message(self):
+    def test_empty_message(self, rate_limit_sleep):
         """Test empty message is not detected."""
         msg = ""
-        assert not check_rate_limit_detection(msg)
+        assert not check_rate_limit_detection(rate_limit_sleep, msg)
 
 
 class TestTimeExtraction:
     """Test time and timezone extraction from messages."""
 
-    def test_simple_extraction(self):
+    def test_simple_extraction(self, rate_limit_sleep):
         """Test extraction from standard message."""
         msg = "hit your limit resets 4am (America/Los_Angeles)"
-        time_str, tz_str = extract_time_and_tz(msg)
+        time_str, tz_str = extract_time_and_tz(rate_limit_sleep, msg)
         assert time_str == "4am"
         assert tz_str == "America/Los_Angeles"
 
-    def test_extraction_with_colon_time(self):
+    def test_extraction_with_colon_time(self, rate_limit_sleep):
         """Test extraction with colon format time."""
         msg = "limit resets 11:30pm (Europe/London)"
-        time_str, tz_str = extract_time_and_tz(msg)
+        time_str, tz_str = extract_time_and_tz(rate_limit_sleep, msg)
         assert time_str == "11:30pm"
         assert tz_str == "Europe/London"
 
-    def test_extraction_from_json_string(self):
+    def test_extraction_from_json_string(self, rate_limit_sleep):
         """Test extraction from JSON-stringified dict."""
         data = {"stop_reason": "hit your limit resets 4am (America/Los_Angeles)"}
         msg = str(data)
-        time_str, tz_str = extract_time_and_tz(msg)
+        time_str, tz_str = extract_time_and_tz(rate_limit_sleep, msg)
         assert time_str == "4am"
         assert tz_str == "America/Los_Angeles"
 
-    def test_menu_option_extraction(self):
+    def test_menu_option_extraction(self, rate_limit_sleep):
         """Test extraction from menu option format."""
         msg = "Stop and wait for limit to reset 4am (America/Los_Angeles)"
-        time_str, tz_str = extract_time_and_tz(msg)
+        time_str, tz_str = extract_time_and_tz(rate_limit_sleep, msg)
         assert time_str == "4am"
         assert tz_str == "America/Los_Angeles"
 
-    def test_no_time_found(self):
+    def test_no_time_found(self, rate_limit_sleep):
         """Test when no time is present."""
         msg = "user requested stop"
-        time_str, tz_str = extract_time_and_tz(msg)
+        time_str, tz_str = extract_time_and_tz(rate_limit_sleep, msg)
         assert time_str is None
         assert tz_str is None
 
@@ -130,15 +123,15 @@ class TestTimeExtraction:
 class TestFullInputProcessing:
     """Test processing of full JSON input structures."""
 
-    def test_json_with_stop_reason(self):
+    def test_json_with_stop_reason(self, rate_limit_sleep):
         """Test processing JSON with stop_reason field."""
         data = {"stop_reason": "hit your limit resets 4am (America/Los_Angeles)"}
         msg = str(data)
-        assert check_rate_limit_detection(msg)
-        time_str, tz_str = extract_time_and_tz(msg)
+        assert check_rate_limit_detection(rate_limit_sleep, msg)
+        time_str, tz_str = extract_time_and_tz(rate_limit_sleep, msg)
         assert time_str == "4am"
 
-    def test_nested_json_structure(self):
+    def test_nested_json_structure(self, rate_limit_sleep):
         """Test processing nested JSON structure."""
         data = {
             "event": "stop",
@@ -147,7 +140,119 @@ class TestFullInputProcessing:
             }
         }
         msg = str(data)
-        assert check_rate_limit_detection(msg)
-        time_str, tz_str = extract_time_and_tz(msg)
+        assert check_rate_limit_detection(rate_limit_sleep, msg)
+        time_str, tz_str = extract_time_and_tz(rate_limit_sleep, msg)
         assert time_str == "11pm"
         assert tz_str == "UTC"
+
+
+class TestTranscriptReading:
+    """Test reading recent content from the transcript file."""
+
+    def test_reads_last_lines(self, rate_limit_sleep, tmp_path):
+        """Test that only the last N entries are returned."""
+        transcript = tmp_path / "transcript.jsonl"
+        lines = [json.dumps({"text": f"usage limit entry {i}"}) for i in range(50)]
+        transcript.write_text("\n".join(lines) + "\n")
+
+        content = rate_limit_sleep.get_recent_transcript_content(str(transcript), num_lines=5)
+        assert "entry 49" in content
+        assert "entry 45" in content
+        assert "entry 44" not in content
+
+    def test_large_transcript_reads_tail(self, rate_limit_sleep, tmp_path):
+        """Test that a transcript larger than the tail window still finds the last entry."""
+        transcript = tmp_path / "transcript.jsonl"
+        filler = json.dumps({"text": "x" * 1000})
+        last = json.dumps({"text": "hit your limit resets 4am (UTC)"})
+        transcript.write_text("\n".join([filler] * 200 + [last]) + "\n")
+
+        content = rate_limit_sleep.get_recent_transcript_content(str(transcript))
+        assert "hit your limit resets 4am (UTC)" in content
+
+    def test_no_rate_limit_candidates(self, rate_limit_sleep, tmp_path):
+        """Test that transcripts without 'limit' or 'rate' are skipped without parsing."""
+        transcript = tmp_path / "transcript.jsonl"
+        lines = [json.dumps({"text": f"task completed {i}"}) for i in range(5)]
+        transcript.write_text("\n".join(lines) + "\n")
+
+        content = rate_limit_sleep.get_recent_transcript_content(str(transcript))
+        assert content == ""
+
+    def test_missing_transcript(self, rate_limit_sleep, tmp_path, monkeypatch):
+        """Test that a missing transcript returns empty content."""
+        monkeypatch.setattr(rate_limit_sleep, "log", lambda message: None)
+        content = rate_limit_sleep.get_recent_transcript_content(str(tmp_path / "missing.jsonl"))
+        assert content == ""
+
+
+class TestHookMode:
+    """Test hook_mode end to end with a stubbed sleep."""
+
+    NOTICE = json.dumps({"type": "assistant", "text": "You've hit your limit · resets 4am (UTC)"})
+
+    def run_hook(self, rate_limit_sleep, monkeypatch, capsys, input_data):
+        """Run hook_mode on input_data; return (stdout line, wake times slept until)."""
+        sleeps = []
+        monkeypatch.setattr(rate_limit_sleep, "log", lambda message: None)
+        monkeypatch.setattr(rate_limit_sleep, "_sleep_until", lambda wake_time, now=None: sleeps.append(wake_time))
+        monkeypatch.setattr(sys, "stdin", io.StringIO(json.dumps(input_data)))
+        rate_limit_sleep.hook_mode()
+        return capsys.readouterr().out.strip(), sleeps
+
+    def write_transcript(self, tmp_path, lines):
+        transcript = tmp_path / "transcript.jsonl"
+        transcript.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return str(transcript)
+
+    def test_notice_in_window_continues(self, rate_limit_sleep, monkeypatch, capsys, tmp_path):
+        """Test that a recent notice sleeps and tells Claude to continue."""
+        filler = [json.dumps({"type": "user", "text": f"step {i}"}) for i in range(5)]
+        path = self.write_transcript(tmp_path, filler + [self.NOTICE])
+
+        out, sleeps = self.run_hook(rate_limit_sleep, monkeypatch, capsys, {"transcript_path": path})
+        assert out == rate_limit_sleep._RESP_CONTINUE
+        assert len(sleeps) == 1
+        assert (sleeps[0].hour, sleeps[0].minute) == (4, rate_limit_sleep.BUFFER_MINUTES)
+
+    def test_no_notice_stops(self, rate_limit_sleep, monkeypatch, capsys, tmp_path):
+        """Test that a transcript without a notice allows the normal stop."""
+        path = self.write_transcript(tmp_path, [json.dumps({"type": "user", "text": "all done"})])
+
+        out, sleeps = self.run_hook(rate_limit_sleep, monkeypatch, capsys, {"transcript_path": path})
+        assert out == rate_limit_sleep._RESP_STOP
+        assert sleeps == []
+
+    def test_notice_outside_window_not_detected(self, rate_limit_sleep, monkeypatch, capsys, tmp_path):
+        """Test that a notice followed by more than TRANSCRIPT_SEARCH_CHARS of text is missed."""
+        later = [json.dumps({"type": "user", "text": "x" * 1000}) for _ in range(5)]
+        assert len(" ".join(later)) > rate_limit_sleep.TRANSCRIPT_SEARCH_CHARS
+        path = self.write_transcript(tmp_path, [self.NOTICE] + later)
+
+        out, sleeps = self.run_hook(rate_limit_sleep, monkeypatch, capsys, {"transcript_path": path})
+        assert out == rate_limit_sleep._RESP_STOP
+        assert sleeps == []
+
+    def test_empty_transcript_path_skips_reading(self, rate_limit_sleep, monkeypatch, capsys):
+        """Test that no transcript read is attempted without a transcript_path."""
+        def fail(*args, **kwargs):
+            raise AssertionError("transcript should not be read")
+        monkeypatch.setattr(rate_limit_sleep, "get_recent_transcript_content", fail)
+
+        out, sleeps = self.run_hook(rate_limit_sleep, monkeypatch, capsys, {"transcript_path": ""})
+        assert out == rate_limit_sleep._RESP_STOP
+        assert sleeps == []
+
+    def test_logged_duration_matches_sleep_across_dst(self, rate_limit_sleep, monkeypatch, capsys, fake_clock):
+        """Test that the announced sleep duration is what is actually slept across a DST change."""
+        # 23:00 PDT on 2024-11-02; the 4am PST reset plus buffer is 12:05 UTC
+        clock = fake_clock(datetime(2024, 11, 3, 6, 0, tzinfo=timezone.utc), ZoneInfo("America/Los_Angeles"))
+        monkeypatch.setattr(rate_limit_sleep, "log", lambda message: None)
+        notice = {"stop_reason": "hit your limit resets 4am (America/Los_Angeles)"}
+        monkeypatch.setattr(sys, "stdin", io.StringIO(json.dumps(notice)))
+
+        rate_limit_sleep.hook_mode()
+        captured = capsys.readouterr()
+        assert captured.out.strip() == rate_limit_sleep._RESP_CONTINUE
+        assert "Pausing for 21900 seconds" in captured.err
+        assert clock.slept == 21900
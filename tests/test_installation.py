@@ -2,18 +2,35 @@
 import pytest
 import json
 import os
-import shutil
 import subprocess
-import tempfile
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-@pytest.fixture
-def temp_home():
-    """Create a temporary home directory for testing."""
-    temp_dir = tempfile.mkdtemp()
-    yield temp_dir
-    shutil.rmtree(temp_dir, ignore_errors=True)
+
+def write_json(path, obj):
+    """Write obj as indented JSON, using orjson when available."""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        path.write_text(json.dumps(obj, indent=2))
+
+
+def read_json(path):
+    """Read JSON from path, using orjson when available."""
+    data = path.read_bytes()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def link_backup(src, dst):
+    """Create a read-only backup as a hardlink, copying if hardlinks aren't supported."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        dst.write_bytes(src.read_bytes())
 
 
 @pytest.fixture
@@ -22,12 +39,20 @@ def project_root():
     return Path(__file__).parent.parent
 
 
+@pytest.fixture
+def fake_home(fs):
+    """Provide an empty home directory on pyfakefs' in-memory filesystem."""
+    home = Path("/home/tester")
+    fs.create_dir(home)
+    return home
+
+
 class TestFreshInstallation:
     """Test installation on a fresh system (no existing settings)."""
 
-    def test_creates_settings_file(self, temp_home, project_root):
+    def test_creates_settings_file(self, fake_home, project_root):
         """Test that fresh install creates settings.json."""
-        claude_dir = Path(temp_home) / ".claude"
+        claude_dir = fake_home / ".claude"
         settings_file = claude_dir / "settings.json"
 
         # Ensure no existing settings
@@ -54,19 +79,17 @@ class TestFreshInstallation:
             }
         }
 
-        with open(settings_file, 'w') as f:
-            json.dump(settings, f, indent=2)
+        write_json(settings_file, settings)
 
         # Verify
         assert settings_file.exists()
-        with open(settings_file) as f:
-            loaded = json.load(f)
+        loaded = read_json(settings_file)
         assert "hooks" in loaded
         assert "Stop" in loaded["hooks"]
 
-    def test_creates_hooks_directory(self, temp_home):
+    def test_creates_hooks_directory(self, fake_home):
         """Test that hooks directory is created."""
-        hooks_dir = Path(temp_home) / ".claude" / "hooks"
+        hooks_dir = fake_home / ".claude" / "hooks"
         hooks_dir.mkdir(parents=True, exist_ok=True)
         assert hooks_dir.exists()
 
@@ -74,9 +97,9 @@ class TestFreshInstallation:
 class TestMergeInstallation:
     """Test installation that merges with existing settings."""
 
-    def test_preserves_existing_settings(self, temp_home):
+    def test_preserves_existing_settings(self, fake_home):
         """Test that existing settings are preserved during merge."""
-        claude_dir = Path(temp_home) / ".claude"
+        claude_dir = fake_home / ".claude"
         claude_dir.mkdir(parents=True, exist_ok=True)
         settings_file = claude_dir / "settings.json"
 
@@ -91,12 +114,10 @@ class TestMergeInstallation:
             }
         }
 
-        with open(settings_file, 'w') as f:
-            json.dump(existing, f, indent=2)
+        write_json(settings_file, existing)
 
         # Simulate merge
-        with open(settings_file) as f:
-            settings = json.load(f)
+        settings = read_json(settings_file)
 
         # Add our hook
         if "Stop" not in settings["hooks"]:
@@ -113,25 +134,19 @@ class TestMergeInstallation:
         }
         settings["hooks"]["Stop"].append(new_hook)
 
-        with open(settings_file, 'w') as f:
-            json.dump(settings, f, indent=2)
-
-        # Verify preservation
-        with open(settings_file) as f:
-            result = json.load(f)
-
-        assert result["theme"] == "dark"
-        assert result["editor"] == "vim"
-        assert "PreCommit" in result["hooks"]
-        assert "Stop" in result["hooks"]
+        # Verify preservation on the merged settings
+        assert settings["theme"] == "dark"
+        assert settings["editor"] == "vim"
+        assert "PreCommit" in settings["hooks"]
+        assert "Stop" in settings["hooks"]
 
 
 class TestIdempotency:
     """Test that running install multiple times is safe."""
 
-    def test_no_duplicate_hooks(self, temp_home):
+    def test_no_duplicate_hooks(self, fake_home):
         """Test that running install twice doesn't duplicate hooks."""
-        claude_dir = Path(temp_home) / ".claude"
+        claude_dir = fake_home / ".claude"
         claude_dir.mkdir(parents=True, exist_ok=True)
         settings_file = claude_dir / "settings.json"
 
@@ -147,12 +162,10 @@ class TestIdempotency:
 
         # First "install"
         settings = {"hooks": {"Stop": [new_hook]}}
-        with open(settings_file, 'w') as f:
-            json.dump(settings, f, indent=2)
+        write_json(settings_file, settings)
 
         # Second "install" - check for existing hook
-        with open(settings_file) as f:
-            settings = json.load(f)
+        settings = read_json(settings_file)
 
         hook_exists = False
         for entry in settings["hooks"]["Stop"]:
@@ -171,60 +184,55 @@ class TestIdempotency:
 class TestBackupFunctionality:
     """Test backup creation during installation."""
 
-    def test_creates_backup_file(self, temp_home):
+    def test_creates_backup_file(self, fake_home):
         """Test that backup is created when settings.json exists."""
-        claude_dir = Path(temp_home) / ".claude"
+        claude_dir = fake_home / ".claude"
         claude_dir.mkdir(parents=True, exist_ok=True)
         settings_file = claude_dir / "settings.json"
 
         # Create existing settings
         original = {"theme": "light", "hooks": {}}
-        with open(settings_file, 'w') as f:
-            json.dump(original, f, indent=2)
+        write_json(settings_file, original)
 
         # Simulate backup creation
         backup_file = Path(str(settings_file) + ".bak")
-        shutil.copy(settings_file, backup_file)
+        link_backup(settings_file, backup_file)
 
         # Verify backup exists and has original content
         assert backup_file.exists()
-        with open(backup_file) as f:
-            backup_content = json.load(f)
+        backup_content = read_json(backup_file)
         assert backup_content["theme"] == "light"
 
-    def test_timestamped_backup_when_bak_exists(self, temp_home):
+    def test_timestamped_backup_when_bak_exists(self, fake_home):
         """Test that timestamped backup is created when .bak already exists."""
-        claude_dir = Path(temp_home) / ".claude"
+        claude_dir = fake_home / ".claude"
         claude_dir.mkdir(parents=True, exist_ok=True)
         settings_file = claude_dir / "settings.json"
 
         # Create existing settings
         original = {"version": 1}
-        with open(settings_file, 'w') as f:
-            json.dump(original, f, indent=2)
+        write_json(settings_file, original)
 
         # Create first backup
         backup_file = Path(str(settings_file) + ".bak")
         old_backup = {"version": 0}
-        with open(backup_file, 'w') as f:
-            json.dump(old_backup, f, indent=2)
+        write_json(backup_file, old_backup)
 
         # Create timestamped backup (simulated)
         timestamped_backup = Path(str(settings_file) + ".bak.20240101_120000")
-        shutil.copy(settings_file, timestamped_backup)
+        link_backup(settings_file, timestamped_backup)
 
         # Verify both backups exist
         assert backup_file.exists()
         assert timestamped_backup.exists()
 
         # Verify original .bak is preserved
-        with open(backup_file) as f:
-            content = json.load(f)
+        content = read_json(backup_file)
         assert content["version"] == 0
 
-    def test_backup_before_modification(self, temp_home):
+    def test_backup_before_modification(self, fake_home):
         """Test that backup captures state before any modifications."""
-        claude_dir = Path(temp_home) / ".claude"
+        claude_dir = fake_home / ".claude"
         claude_dir.mkdir(parents=True, exist_ok=True)
         settings_file = claude_dir / "settings.json"
 
@@ -234,26 +242,37 @@ class TestBackupFunctionality:
                 "PreSave": [{"hooks": [{"type": "command", "command": "lint"}]}]
             }
         }
-        with open(settings_file, 'w') as f:
-            json.dump(original, f, indent=2)
+        write_json(settings_file, original)
 
-        # Create backup
+        # Create backup (a real copy: a hardlink would see the modification below)
         backup_file = Path(str(settings_file) + ".bak")
-        shutil.copy(settings_file, backup_file)
+        backup_file.write_bytes(settings_file.read_bytes())
 
         # Modify settings
-        with open(settings_file) as f:
-            settings = json.load(f)
+        settings = read_json(settings_file)
         settings["hooks"]["Stop"] = [{"hooks": []}]
-        with open(settings_file, 'w') as f:
-            json.dump(settings, f, indent=2)
+        write_json(settings_file, settings)
 
         # Verify backup doesn't have Stop hook
-        with open(backup_file) as f:
-            backup_content = json.load(f)
+        backup_content = read_json(backup_file)
         assert "Stop" not in backup_content["hooks"]
 
         # Verify current settings do have Stop hook
-        with open(settings_file) as f:
-            current = json.load(f)
-        assert "Stop" in current["hooks"]
+        assert "Stop" in settings["hooks"]
+
+
+@pytest.mark.real_fs
+class TestRealFilesystem:
+    """Smoke test the install simulation against the real filesystem."""
+
+    def test_fresh_install_on_disk(self, tmp_path):
+        """Test that settings.json round-trips through a real directory."""
+        hooks_dir = tmp_path / ".claude" / "hooks"
+        hooks_dir.mkdir(parents=True)
+        settings_file = tmp_path / ".claude" / "settings.json"
+
+        settings = {"hooks": {"Stop": [{"hooks": [{"type": "command", "timeout": 86400}]}]}}
+        write_json(settings_file, settings)
+
+        assert read_json(settings_file) == settings
+        assert hooks_dir.is_dir()
@@ -1,33 +1,40 @@
 """Tests for manual duration/time parsing."""
 import pytest
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 
-class TestDurationParsing:
-    """Test parse_duration function."""
+real_sleep = time.sleep
 
-    def test_seconds(self, rate_limit_sleep):
-        assert rate_limit_sleep.parse_duration("45s") == 45
-        assert rate_limit_sleep.parse_duration("45sec") == 45
-        assert rate_limit_sleep.parse_duration("45seconds") == 45
+LOS_ANGELES = ZoneInfo("America/Los_Angeles")
 
-    def test_minutes(self, rate_limit_sleep):
-        assert rate_limit_sleep.parse_duration("30m") == 30 * 60
-        assert rate_limit_sleep.parse_duration("30min") == 30 * 60
-        assert rate_limit_sleep.parse_duration("30minutes") == 30 * 60
 
-    def test_hours(self, rate_limit_sleep):
-        assert rate_limit_sleep.parse_duration("2h") == 2 * 3600
-        assert rate_limit_sleep.parse_duration("2hr") == 2 * 3600
-        assert rate_limit_sleep.parse_duration("2hours") == 2 * 3600
+class TestDurationParsing:
+    """Test parse_duration function."""
 
-    def test_float_input(self, rate_limit_sleep):
-        assert rate_limit_sleep.parse_duration("1.5h") == int(1.5 * 3600)
-        assert rate_limit_sleep.parse_duration("0.5m") == 30
+    @pytest.mark.parametrize("duration_str,expected", [
+        ("45s", 45),
+        ("45sec", 45),
+        ("45seconds", 45),
+        ("30m", 30 * 60),
+        ("30min", 30 * 60),
+        ("30minutes", 30 * 60),
+        ("2h", 2 * 3600),
+        ("2hr", 2 * 3600),
+        ("2hours", 2 * 3600),
+        ("1.5h", int(1.5 * 3600)),
+        ("0.5m", 30),
+    ])
+    def test_valid_durations(self, rate_limit_sleep, duration_str, expected):
+        assert rate_limit_sleep.parse_duration(duration_str) == expected
 
-    def test_invalid_input(self, rate_limit_sleep):
-        assert rate_limit_sleep.parse_duration("invalid") is None
-        assert rate_limit_sleep.parse_duration("45x") is None
-        assert rate_limit_sleep.parse_duration("123") is None  # Needs unit
+    @pytest.mark.parametrize("duration_str", [
+        "invalid",
+        "45x",
+        "123",  # Needs unit
+    ])
+    def test_invalid_input(self, rate_limit_sleep, duration_str):
+        assert rate_limit_sleep.parse_duration(duration_str) is None
 
 class TestTimeToSecondsParsing:
     """Test parse_time_to_seconds function."""
@@ -65,3 +72,37 @@ class TestParseDurationOrTime:
     def test_raises_on_invalid(self, rate_limit_sleep):
         with pytest.raises(ValueError, match="Could not parse"):
             rate_limit_sleep.parse_duration_or_time("invalid argument")
+
+class TestSleepUntil:
+    """Test the chunked _sleep_until helper."""
+
+    def test_past_time_returns_immediately(self, rate_limit_sleep, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr(rate_limit_sleep.time, "sleep", sleeps.append)
+        rate_limit_sleep._sleep_until(datetime.now(timezone.utc) - timedelta(seconds=5))
+        assert sleeps == []
+
+    def test_sleeps_in_bounded_steps(self, rate_limit_sleep, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr(rate_limit_sleep, "SLEEP_CHECK_SECONDS", 0.01)
+        monkeypatch.setattr(rate_limit_sleep.time, "sleep", lambda s: (sleeps.append(s), real_sleep(s)))
+        rate_limit_sleep._sleep_until(datetime.now(timezone.utc) + timedelta(seconds=0.05))
+        assert len(sleeps) > 1
+        assert max(sleeps) <= 0.01
+
+    def test_hook_wake_across_dst_fall_back(self, rate_limit_sleep, fake_clock):
+        """Test that a reset after clocks fall back isn't reached an hour early."""
+        # 23:00 PDT on 2024-11-02 until a 04:05 PST reset; clocks fall back at 02:00
+        clock = fake_clock(datetime(2024, 11, 3, 6, 0, tzinfo=timezone.utc), LOS_ANGELES)
+
+        rate_limit_sleep._sleep_until(datetime(2024, 11, 3, 4, 5, tzinfo=LOS_ANGELES))
+        assert clock.utc == datetime(2024, 11, 3, 12, 5, tzinfo=timezone.utc)
+
+    def test_manual_sleep_across_dst_spring_forward(self, rate_limit_sleep, fake_clock, monkeypatch, capsys):
+        """Test that '2h' sleeps two real hours when local clocks jump forward."""
+        # 01:30 PST on 2024-03-10; Los Angeles clocks jump from 02:00 to 03:00
+        clock = fake_clock(datetime(2024, 3, 10, 9, 30, tzinfo=timezone.utc), LOS_ANGELES)
+        monkeypatch.setattr(rate_limit_sleep, "log", lambda message: None)
+
+        rate_limit_sleep.manual_sleep("2h")
+        assert clock.slept == 2 * 3600
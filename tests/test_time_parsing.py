@@ -1,65 +1,40 @@
 """Tests for time parsing functionality."""
 import pytest
-from datetime import datetime, timedelta
+from datetime import datetime
 from zoneinfo import ZoneInfo
 
+# Comparison targets, built once per module
+LOS_ANGELES = ZoneInfo("America/Los_Angeles")
+NEW_YORK = ZoneInfo("America/New_York")
+LONDON = ZoneInfo("Europe/London")
+TOKYO = ZoneInfo("Asia/Tokyo")
+UTC = ZoneInfo("UTC")
+
 
 class TestTimeFormatParsing:
     """Test various time format strings."""
 
-    def test_simple_am(self, rate_limit_sleep):
-        """Test simple AM time like '4am'."""
-        result = rate_limit_sleep.parse_reset_time("4am", "UTC")
-        assert result.hour == 4
-        assert result.minute == 0
-
-    def test_simple_pm(self, rate_limit_sleep):
-        """Test simple PM time like '11pm'."""
-        result = rate_limit_sleep.parse_reset_time("11pm", "UTC")
-        assert result.hour == 23
-        assert result.minute == 0
-
-    def test_colon_format_am(self, rate_limit_sleep):
-        """Test colon format like '4:00am'."""
-        result = rate_limit_sleep.parse_reset_time("4:00am", "UTC")
-        assert result.hour == 4
-        assert result.minute == 0
-
-    def test_colon_format_pm_with_minutes(self, rate_limit_sleep):
-        """Test colon format like '11:30pm'."""
-        result = rate_limit_sleep.parse_reset_time("11:30pm", "UTC")
-        assert result.hour == 23
-        assert result.minute == 30
-
-    def test_midnight(self, rate_limit_sleep):
-        """Test midnight (12am)."""
-        result = rate_limit_sleep.parse_reset_time("12am", "UTC")
-        assert result.hour == 0
-        assert result.minute == 0
-
-    def test_noon(self, rate_limit_sleep):
-        """Test noon (12pm)."""
-        result = rate_limit_sleep.parse_reset_time("12pm", "UTC")
-        assert result.hour == 12
-        assert result.minute == 0
-
-    def test_almost_midnight(self, rate_limit_sleep):
-        """Test 11:59pm."""
-        result = rate_limit_sleep.parse_reset_time("11:59pm", "UTC")
-        assert result.hour == 23
-        assert result.minute == 59
-
-    def test_whitespace_between(self, rate_limit_sleep):
-        """Test time with space like '4 am'."""
-        result = rate_limit_sleep.parse_reset_time("4 am", "UTC")
-        assert result.hour == 4
-        assert result.minute == 0
-
-    def test_uppercase_am_pm(self, rate_limit_sleep):
-        """Test uppercase AM/PM like '4AM'."""
-        result = rate_limit_sleep.parse_reset_time("4AM", "UTC")
-        assert result.hour == 4
-        assert result.minute == 0
+    @pytest.mark.parametrize("time_str,hour,minute", [
+        ("4am", 4, 0),          # simple AM
+        ("11pm", 23, 0),        # simple PM
+        ("4:00am", 4, 0),       # colon format
+        ("11:30pm", 23, 30),    # colon format with minutes
+        ("12am", 0, 0),         # midnight
+        ("12pm", 12, 0),        # noon
+        ("11:59pm", 23, 59),    # almost midnight
+        ("4 am", 4, 0),         # whitespace between
+        ("4AM", 4, 0),          # uppercase AM/PM
+    ])
+    def test_time_formats(self, rate_limit_sleep, time_str, hour, minute):
+        """Test that supported time formats parse to the right hour and minute."""
+        result = rate_limit_sleep.parse_reset_time(time_str, "UTC")
+        assert result.hour == hour
+        assert result.minute == minute
+
+    def test_invalid_time(self, rate_limit_sleep):
+        """Test that an unparseable time raises ValueError."""
+        with pytest.raises(ValueError, match="Could not parse reset time"):
+            rate_limit_sleep.parse_reset_time("noon", "UTC")
 
 
 class TestTimezoneHandling:
@@ -68,71 +43,65 @@ class TestTimezoneHandling:
     def test_los_angeles(self, rate_limit_sleep):
         """Test America/Los_Angeles timezone."""
         result = rate_limit_sleep.parse_reset_time("4am", "America/Los_Angeles")
-        assert result.tzinfo == ZoneInfo("America/Los_Angeles")
+        assert result.tzinfo is LOS_ANGELES
 
     def test_new_york(self, rate_limit_sleep):
         """Test America/New_York timezone."""
         result = rate_limit_sleep.parse_reset_time("4am", "America/New_York")
-        assert result.tzinfo == ZoneInfo("America/New_York")
+        assert result.tzinfo is NEW_YORK
 
     def test_london(self, rate_limit_sleep):
         """Test Europe/London timezone."""
         result = rate_limit_sleep.parse_reset_time("4am", "Europe/London")
-        assert result.tzinfo == ZoneInfo("Europe/London")
+        assert result.tzinfo is LONDON
 
     def test_tokyo(self, rate_limit_sleep):
         """Test Asia/Tokyo timezone."""
         result = rate_limit_sleep.parse_reset_time("4am", "Asia/Tokyo")
-        assert result.tzinfo == ZoneInfo("Asia/Tokyo")
+        assert result.tzinfo is TOKYO
 
     def test_utc(self, rate_limit_sleep):
         """Test UTC timezone."""
         result = rate_limit_sleep.parse_reset_time("4am", "UTC")
-        assert result.tzinfo == ZoneInfo("UTC")
+        assert result.tzinfo is UTC
 
     def test_space_normalization(self, rate_limit_sleep):
         """Test that spaces in timezone are converted to underscores."""
         # "America/Los Angeles" should become "America/Los_Angeles"
         result = rate_limit_sleep.parse_reset_time("4am", "America/Los Angeles")
-        assert result.tzinfo == ZoneInfo("America/Los_Angeles")
+        assert result.tzinfo is LOS_ANGELES
+
+    def test_zoneinfo_lookup_cached(self, rate_limit_sleep):
+        """Test that repeated timezone lookups are served from the hook's cache."""
+        rate_limit_sleep.parse_reset_time("4am", "Asia/Tokyo")
+        hits = rate_limit_sleep._get_zoneinfo.cache_info().hits
+        rate_limit_sleep.parse_reset_time("5am", "Asia/Tokyo")
+        assert rate_limit_sleep._get_zoneinfo.cache_info().hits == hits + 1
 
 
 class TestPastTimeHandling:
     """Test that past times are handled correctly (add a day)."""
 
+    # Fixed clock so results don't depend on when the tests run
+    NOW = datetime(2024, 6, 15, 12, 0, tzinfo=UTC)
+
     def test_past_time_adds_day(self, rate_limit_sleep):
         """Test that a time in the past results in next day."""
-        tz = ZoneInfo("UTC")
-        now = datetime.now(tz)
-
-        # Parse a time that's 1 hour ago
-        past_hour = (now.hour - 1) % 24
-        if past_hour < 12:
-            time_str = f"{past_hour}am" if past_hour != 0 else "12am"
-        else:
-            time_str = f"{past_hour - 12}pm" if past_hour != 12 else "12pm"
-
-        result = rate_limit_sleep.parse_reset_time(time_str, "UTC")
-
-        # Result should be in the future
-        assert result > now
+        result = rate_limit_sleep.parse_reset_time("11am", "UTC", self.NOW)
+        assert result == datetime(2024, 6, 16, 11, 0, tzinfo=UTC)
 
     def test_future_time_same_day(self, rate_limit_sleep):
         """Test that a time in the future stays on same day."""
-        tz = ZoneInfo("UTC")
-        now = datetime.now(tz)
-
-        # Parse a time that's 2 hours from now
-        future_hour = (now.hour + 2) % 24
-        if future_hour < 12:
-            time_str = f"{future_hour}am" if future_hour != 0 else "12am"
-        else:
-            adjusted_hour = future_hour - 12 if future_hour != 12 else 12
-            time_str = f"{adjusted_hour}pm"
-
-        result = rate_limit_sleep.parse_reset_time(time_str, "UTC")
-
-        # Result should be in the future
-        assert result > now
-        # And within 24 hours (not next day, unless we're close to midnight)
-        assert result - now < timedelta(days=1)
+        result = rate_limit_sleep.parse_reset_time("2pm", "UTC", self.NOW)
+        assert result == datetime(2024, 6, 15, 14, 0, tzinfo=UTC)
+
+    def test_current_time_adds_day(self, rate_limit_sleep):
+        """Test that a reset time equal to now is treated as tomorrow."""
+        result = rate_limit_sleep.parse_reset_time("12pm", "UTC", self.NOW)
+        assert result == datetime(2024, 6, 16, 12, 0, tzinfo=UTC)
+
+    def test_now_in_other_timezone(self, rate_limit_sleep):
+        """Test that 'now' is converted into the reset timezone before comparing."""
+        # 12:00 UTC is 21:00 in Tokyo, so 8pm Tokyo has already passed
+        result = rate_limit_sleep.parse_reset_time("8pm", "Asia/Tokyo", self.NOW)
+        assert result == datetime(2024, 6, 16, 20, 0, tzinfo=TOKYO)